@@ -1,12 +1,14 @@
 #!/usr/bin/env python3
+import html
 import os
 import time
-import json
+import logging
 import asyncio
-import requests
+import httpx
+import orjson
 import re
 from datetime import datetime
-from typing import List, Dict, Optional, Any, Tuple
+from typing import List, Dict, Optional, Any, Set, Tuple
 from pydantic import BaseModel, Field
 
 # Import AutoGen components
@@ -16,13 +18,44 @@ from autogen_core.models import SystemMessage, UserMessage
 from autogen_ext.models.openai import OpenAIChatCompletionClient
 from autogen_ext.tools.mcp import McpWorkbench, StdioServerParams
 
+logger = logging.getLogger(__name__)
 
-# Custom JSON Encoder for datetime objects
-class DateTimeEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        return super().default(obj)
+# Markdown code fences the LLM sometimes wraps its HTML in
+_MD_FENCE = re.compile(r'```(?:html)?')
+# HTML tags removed (or turned into plain-text equivalents) for the text/plain email part
+_HTML_STRIP = re.compile(r'</?(?:h2|h3|p|ul)>|<br>|<li>|</li>')
+_HTML_STRIP_REPLACEMENTS = {"<br>": "\n", "<li>": "- "}
+
+# Notification email bodies, filled in with str.format_map
+_TEXT_TEMPLATE = """
+New GitHub Release: {name} ({tag_name})
+Repository: {owner}/{repo}
+Published at: {published_at}
+URL: {url}
+
+Release Analysis:
+{analysis}
+"""
+
+_HTML_TEMPLATE = """
+<html>
+<body>
+  <h1>New GitHub Release: {name}</h1>
+  <p><strong>Repository:</strong> <a href="https://github.com/{owner}/{repo}">{owner}/{repo}</a></p>
+  <p><strong>Tag:</strong> {tag_name}</p>
+  <p><strong>Published at:</strong> {published_at}</p>
+  <p><strong>URL:</strong> <a href="{url}">{url}</a></p>
+  
+  <hr>
+  <h2>Release Analysis</h2>
+  {analysis}
+</body>
+</html>
+"""
+
+
+class ReleaseFetchError(Exception):
+    """Raised when releases could not be fetched from GitHub."""
 
 
 # Define Pydantic models for our data structures
@@ -39,6 +72,7 @@ class RepoConfig(BaseModel):
     owner: str
     repo: str
     latest_check: Optional[str] = None  # Store as string instead of datetime
+    etag: Optional[str] = None  # ETag of the last releases response, for conditional requests
     releases: List[Release] = Field(default_factory=list)
 
 
@@ -58,50 +92,207 @@ class EmailPayload(BaseModel):
 
 # GitHub Release Agent to monitor releases
 class GitHubReleaseAgent(RoutedAgent):
+    # Number of logged releases after which the history snapshot is rewritten
+    COMPACT_EVERY = 100
+    # Maximum number of concurrent GitHub API requests
+    MAX_CONCURRENT_REQUESTS = 10
+    # Pause requests when fewer than this many rate-limited calls remain
+    RATE_LIMIT_FLOOR = 50
+    # Retries for responses rejected by GitHub's rate limiting
+    MAX_RETRIES = 3
+    # Releases requested per REST page; only the newest few are ever new
+    RELEASES_PER_PAGE = 5
+    # Maximum REST pages followed when a whole page consists of new releases
+    MAX_PAGES = 10
+    GRAPHQL_URL = "https://api.github.com/graphql"
+    # Repositories per GraphQL query and releases fetched per repository
+    GRAPHQL_BATCH_SIZE = 50
+    GRAPHQL_RELEASES_PER_REPO = RELEASES_PER_PAGE
+    # Maximum node IDs GitHub accepts in a single nodes(ids:) lookup
+    GRAPHQL_MAX_NODE_IDS = 100
+    
     def __init__(self, history_file: str = "release_history.json", token: Optional[str] = None):
         super().__init__("A GitHub Release monitoring agent")
-        self.headers = {"User-Agent": "GitHub-Release-Monitor"}
+        self.headers = {
+            "User-Agent": "GitHub-Release-Monitor",
+            "Accept": "application/vnd.github+json",
+            # Pin the REST API version so responses don't change shape under us
+            "X-GitHub-Api-Version": "2022-11-28",
+        }
         if token:
             self.headers["Authorization"] = f"token {token}"
         self.history_file = history_file
+        # Resolve the history path and ensure its directory exists once, not on every save
+        self._history_path = os.path.abspath(history_file)
+        self._log_path = self._history_path + ".log"
+        os.makedirs(os.path.dirname(self._history_path), exist_ok=True)
         self.history = self._load_history()
+        self._http: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_REQUESTS)
+        self._next_allowed = 0.0  # Epoch time before which no request is sent
+        # Append-only log of releases found since the last snapshot
+        self._log = None
+        self._log_events = 0
+    
+    async def start(self):
+        """Create the HTTP/2 client reused across all polls, multiplexing GitHub requests over one connection."""
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                http2=True,
+                headers=self.headers,
+                timeout=20.0,
+                limits=httpx.Limits(max_keepalive_connections=20),
+            )
+    
+    async def close(self):
+        """Close the HTTP client and write the final history snapshot."""
+        if self._http is not None:
+            await self._http.aclose()
+        self._http = None
+        # Also persists ETags and check times, which are only written with snapshots
+        self._save_history()
     
     def _load_history(self) -> ReleaseHistory:
-        """Load release history from file or create new if not exists."""
-        # Resolve absolute path for history file
-        history_file_path = os.path.abspath(self.history_file)
+        """Load release history snapshot, replay the release log, or create new if not exists."""
+        history_file_path = self._history_path
         print(f"Loading release history from: {history_file_path}")
         
+        history = ReleaseHistory()
         if os.path.exists(history_file_path):
             try:
-                with open(history_file_path, 'r') as f:
-                    data = json.load(f)
-                history = ReleaseHistory(**data)
-                print(f"Loaded history with {len(history.repositories)} repositories")
-                for repo in history.repositories:
-                    print(f"  - {repo.owner}/{repo.repo}: {len(repo.releases)} releases")
-                return history
+                with open(history_file_path, 'rb') as f:
+                    data = orjson.loads(f.read())
+                history = self._history_from_data(data)
             except Exception as e:
                 print(f"Error loading history: {e}")
-                return ReleaseHistory()
+                history = ReleaseHistory()
         else:
             print(f"History file not found. Starting with empty history.")
-            return ReleaseHistory()
-    
-    def _save_history(self):
-        """Save release history to file."""
-        # Resolve absolute path for history file
-        history_file_path = os.path.abspath(self.history_file)
-        print(f"Saving release history to: {history_file_path}")
         
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(history_file_path), exist_ok=True)
+        if os.path.exists(self._log_path):
+            replayed = self._replay_log(history, self._log_path)
+            print(f"Replayed {replayed} release(s) from {self._log_path}")
         
-        with open(history_file_path, 'w') as f:
-            # Use the custom encoder to handle datetime objects
-            json.dump(self.history.model_dump(), f, indent=2, cls=DateTimeEncoder)
+        # Release IDs per repository, kept in sync with the history so checks never rescan it
+        self._known_ids: Dict[Tuple[str, str], Set[int]] = {
+            (repo.owner, repo.repo): {release.id for release in repo.releases}
+            for repo in history.repositories
+        }
         
-        print(f"Saved history with {len(self.history.repositories)} repositories")
+        print(f"Loaded history with {len(history.repositories)} repositories")
+        for repo in history.repositories:
+            print(f"  - {repo.owner}/{repo.repo}: {len(repo.releases)} releases")
+        return history
+    
+    @staticmethod
+    def _history_from_data(data: Dict[str, Any]) -> ReleaseHistory:
+        """
+        Build the history from a snapshot written by _save_history.
+        
+        Models are constructed without validation, but required keys are read explicitly so a
+        malformed snapshot raises KeyError here instead of failing later. Release notes are
+        dropped: the history only serves to recognise known releases.
+        """
+        return ReleaseHistory.model_construct(repositories=[
+            RepoConfig.model_construct(
+                owner=repo["owner"],
+                repo=repo["repo"],
+                latest_check=repo.get("latest_check"),
+                etag=repo.get("etag"),
+                releases=[
+                    GitHubReleaseAgent._release_from_data(release)
+                    for release in repo.get("releases", [])
+                ],
+            )
+            for repo in data["repositories"]
+        ])
+    
+    @staticmethod
+    def _release_from_data(release: Dict[str, Any]) -> Release:
+        """Build a stored release without its notes, raising KeyError if a required key is missing."""
+        return Release.model_construct(
+            id=release["id"],
+            tag_name=release["tag_name"],
+            name=release["name"],
+            published_at=release["published_at"],
+            html_url=release["html_url"],
+        )
+    
+    def _replay_log(self, history: ReleaseHistory, log_file_path: str) -> int:
+        """Apply releases from the log to the history. Returns the number of releases added."""
+        repos = {(r.owner, r.repo): r for r in history.repositories}
+        known_ids = {key: {release.id for release in r.releases} for key, r in repos.items()}
+        replayed = 0
+        
+        with open(log_file_path, 'rb') as f:
+            for line in f:
+                try:
+                    event = orjson.loads(line)
+                    key = (event["owner"], event["repo"])
+                    release = self._release_from_data(event["release"])
+                except (KeyError, TypeError, ValueError) as e:
+                    # A crash mid-append can leave a partial last line
+                    print(f"Skipping unreadable release log entry: {e}")
+                    continue
+                
+                if key not in repos:
+                    repos[key] = RepoConfig(owner=key[0], repo=key[1])
+                    known_ids[key] = set()
+                    history.repositories.append(repos[key])
+                
+                # Entries already in the snapshot are skipped (crash between snapshot and log truncation)
+                if release.id not in known_ids[key]:
+                    repos[key].releases.append(release)
+                    known_ids[key].add(release.id)
+                    replayed += 1
+        
+        return replayed
+    
+    def _append_releases(self, owner: str, repo: str, releases: List[Release]):
+        """Append new releases to the log, compacting into the snapshot every COMPACT_EVERY releases."""
+        if self._log is None:
+            self._log = open(self._log_path, 'ab+')
+            # Terminate a partial line left by a crash so the next entry starts cleanly
+            if self._log.tell() > 0:
+                self._log.seek(-1, os.SEEK_END)
+                if self._log.read(1) != b"\n":
+                    self._log.write(b"\n")
+        
+        self._log.write(b"".join(
+            orjson.dumps({"owner": owner, "repo": repo, "release": release.model_dump(mode="json")}) + b"\n"
+            for release in releases
+        ))
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        
+        self._log_events += len(releases)
+        if self._log_events >= self.COMPACT_EVERY:
+            self._save_history()
+    
+    def _save_history(self):
+        """Atomically write the full history snapshot and truncate the release log."""
+        logger.debug("Saving release history to: %s", self._history_path)
+        
+        # mode="json" turns datetimes etc. into strings; orjson encodes the result in C
+        data = orjson.dumps(self.history.model_dump(mode="json"), option=orjson.OPT_INDENT_2)
+        
+        # Write to a temporary file and swap it in so a crash never leaves a truncated snapshot
+        tmp_file_path = self._history_path + ".tmp"
+        with open(tmp_file_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file_path, self._history_path)
+        
+        # Everything in the log is now part of the snapshot
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if os.path.exists(self._log_path):
+            os.remove(self._log_path)
+        self._log_events = 0
+        
+        logger.debug("Saved history with %d repositories", len(self.history.repositories))
     
     def _get_repo_index(self, owner: str, repo: str) -> int:
         """Get index of repository in history or -1 if not found."""
@@ -116,22 +307,232 @@ class GitHubReleaseAgent(RoutedAgent):
         if index == -1:
             # Repository doesn't exist, add it
             self.history.repositories.append(RepoConfig(owner=owner, repo=repo))
+            self._known_ids[(owner, repo)] = set()
             index = len(self.history.repositories) - 1
         return index
     
-    async def get_releases(self, owner: str, repo: str) -> List[Dict[str, Any]]:
-        """Fetch all releases from GitHub API for a specific repository."""
+    async def get_releases(self, owner: str, repo: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Fetch the newest releases from GitHub API for a specific repository.
+        
+        Only the first RELEASES_PER_PAGE releases are requested. Further pages are followed
+        (up to MAX_PAGES) only while none of the fetched releases is already known.
+        
+        Returns:
+            List of release dicts, newest first, or None if the releases are unchanged since the last fetch.
+        
+        Raises:
+            ReleaseFetchError: If the request failed or GitHub returned an error status.
+        """
         api_url = f"https://api.github.com/repos/{owner}/{repo}/releases"
+        repo_config = self.history.repositories[self._ensure_repo_exists(owner, repo)]
+        
+        # Conditional request: a 304 reply has no body and doesn't count against the rate limit
+        headers = {"If-None-Match": repo_config.etag} if repo_config.etag else None
+        
         try:
-            response = requests.get(api_url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching releases for {owner}/{repo}: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                print(f"Status code: {e.response.status_code}")
-                print(f"Response: {e.response.text}")
-            return []
+            response = await self._get(api_url, params={"per_page": self.RELEASES_PER_PAGE}, headers=headers)
+            if response.status_code == 304:
+                print(f"No changes in {owner}/{repo} since last check")
+                return None
+            if response.status_code >= 400:
+                raise ReleaseFetchError(
+                    f"Error fetching releases for {owner}/{repo}: status code {response.status_code}: {response.text}"
+                )
+            releases_data = response.json()
+            etag = response.headers.get("ETag")
+            
+            # More than a page of releases may have been published since the last check
+            known_release_ids = self._known_ids[(owner, repo)]
+            if known_release_ids:
+                page = releases_data
+                for _ in range(self.MAX_PAGES - 1):
+                    next_url = response.links.get("next", {}).get("url")
+                    if not next_url or any(release['id'] in known_release_ids for release in page):
+                        break
+                    response = await self._get(next_url)
+                    if response.status_code >= 400:
+                        print(f"Error fetching more releases for {owner}/{repo}: status code {response.status_code}")
+                        break
+                    page = response.json()
+                    releases_data.extend(page)
+            
+            # Only remember the ETag once the releases were fetched, so a failure isn't masked by a 304
+            repo_config.etag = etag
+            return releases_data
+        except (httpx.HTTPError, ValueError) as e:
+            raise ReleaseFetchError(f"Error fetching releases for {owner}/{repo}: {e}") from e
+    
+    async def _get(self, url: str, **kwargs) -> httpx.Response:
+        """Send a throttled GET request, retrying responses rejected by rate limiting."""
+        if self._http is None:
+            await self.start()
+        for attempt in range(self.MAX_RETRIES + 1):
+            async with self._semaphore:
+                await self._wait_for_rate_limit()
+                response = await self._http.get(url, **kwargs)
+                self._update_rate_limit(response.headers)
+            retry_after = self._get_retry_after(response)
+            if retry_after is None or attempt == self.MAX_RETRIES:
+                return response
+            print(f"Rate limited requesting {url}, retrying in {retry_after:.0f} seconds")
+            await asyncio.sleep(retry_after)
+    
+    async def _graphql_fetch_all(self, repositories: List[Tuple[str, str]]) -> Optional[Dict[Tuple[str, str], List[Dict[str, Any]]]]:
+        """
+        Fetch the latest releases of all repositories through the GraphQL API.
+        
+        Repositories are queried in batches of GRAPHQL_BATCH_SIZE aliased sub-queries,
+        each batch costing a single request. Repositories that could not be resolved, or
+        whose whole page of releases is new, are left out so the caller can use the REST API.
+        
+        Returns:
+            Dict mapping (owner, repo) to release dicts shaped like the REST API's,
+            or None if any batch failed.
+        """
+        batches = [
+            repositories[i:i + self.GRAPHQL_BATCH_SIZE]
+            for i in range(0, len(repositories), self.GRAPHQL_BATCH_SIZE)
+        ]
+        results = await asyncio.gather(*(self._graphql_fetch_batch(batch) for batch in batches))
+        if any(result is None for result in results):
+            return None
+        
+        releases_by_repo = {}
+        for result in results:
+            releases_by_repo.update(result)
+        return releases_by_repo
+    
+    async def _graphql_fetch_batch(self, repositories: List[Tuple[str, str]]) -> Optional[Dict[Tuple[str, str], List[Dict[str, Any]]]]:
+        """Fetch the latest releases of up to GRAPHQL_BATCH_SIZE repositories in one GraphQL query."""
+        # Pass owners and names as variables rather than interpolating them into the query
+        variables = {}
+        declarations = []
+        fields = []
+        for i, (owner, repo) in enumerate(repositories):
+            variables[f"o{i}"] = owner
+            variables[f"n{i}"] = repo
+            declarations.append(f"$o{i}: String!, $n{i}: String!")
+            # Release notes are left out here and fetched only for releases not seen before
+            fields.append(
+                f"r{i}: repository(owner: $o{i}, name: $n{i}) {{ "
+                f"releases(first: {self.GRAPHQL_RELEASES_PER_REPO}, orderBy: {{field: CREATED_AT, direction: DESC}}) {{ "
+                "nodes { id databaseId tagName name publishedAt url isDraft } } }"
+            )
+        data = await self._graphql_query(f"query({', '.join(declarations)}) {{ {' '.join(fields)} }}", variables)
+        if data is None:
+            return None
+        
+        nodes_by_repo = {}
+        new_node_ids = []
+        for i, (owner, repo) in enumerate(repositories):
+            repository = data.get(f"r{i}")
+            if repository is None:
+                continue
+            nodes = repository["releases"]["nodes"]
+            known_release_ids = self._known_ids.get((owner, repo), set())
+            new_nodes = [
+                node for node in nodes
+                if node["databaseId"] not in known_release_ids and not node["isDraft"]
+            ]
+            # A full page without any known release may continue past it; the REST API follows further pages
+            if (
+                known_release_ids
+                and len(nodes) == self.GRAPHQL_RELEASES_PER_REPO
+                and not any(node["databaseId"] in known_release_ids for node in nodes)
+            ):
+                continue
+            nodes_by_repo[(owner, repo)] = nodes
+            new_node_ids.extend(node["id"] for node in new_nodes)
+        
+        descriptions = await self._graphql_fetch_descriptions(new_node_ids)
+        if descriptions is None:
+            return None
+        
+        return {
+            key: [
+                {
+                    "id": node["databaseId"],
+                    "tag_name": node["tagName"],
+                    "name": node["name"],
+                    "published_at": node["publishedAt"],
+                    "html_url": node["url"],
+                    "body": descriptions.get(node["id"]),
+                    "draft": node["isDraft"],
+                }
+                for node in nodes
+            ]
+            for key, nodes in nodes_by_repo.items()
+        }
+    
+    async def _graphql_fetch_descriptions(self, node_ids: List[str]) -> Optional[Dict[str, Optional[str]]]:
+        """Fetch release notes for the given release node IDs. Returns None if a query failed."""
+        descriptions = {}
+        for i in range(0, len(node_ids), self.GRAPHQL_MAX_NODE_IDS):
+            data = await self._graphql_query(
+                "query($ids: [ID!]!) { nodes(ids: $ids) { ... on Release { id description } } }",
+                {"ids": node_ids[i:i + self.GRAPHQL_MAX_NODE_IDS]},
+            )
+            if data is None:
+                return None
+            for node in data.get("nodes") or []:
+                if node is not None:
+                    descriptions[node["id"]] = node.get("description")
+        return descriptions
+    
+    async def _graphql_query(self, query: str, variables: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Run a throttled GraphQL query and return its data, or None if the request failed."""
+        if self._http is None:
+            await self.start()
+        try:
+            async with self._semaphore:
+                await self._wait_for_rate_limit()
+                response = await self._http.post(self.GRAPHQL_URL, json={"query": query, "variables": variables})
+                self._update_rate_limit(response.headers)
+            if response.status_code >= 400:
+                print("Error running GraphQL release query")
+                print(f"Status code: {response.status_code}")
+                print(f"Response: {response.text}")
+                return None
+            payload = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"Error running GraphQL release query: {e}")
+            return None
+        
+        # Errors for individual repositories (e.g. not found) come back alongside partial data
+        for error in payload.get("errors") or []:
+            print(f"GraphQL error: {error.get('message')}")
+        return payload.get("data")
+    
+    async def _wait_for_rate_limit(self):
+        """Sleep until the rate limit window resets if the remaining budget ran low."""
+        delay = self._next_allowed - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    def _update_rate_limit(self, headers) -> None:
+        """Record the rate limit reset time when the remaining budget drops below the floor."""
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        # Unauthenticated clients only get 60 requests per hour, so scale the floor to the limit
+        limit = int(headers.get("X-RateLimit-Limit", 5000))
+        if int(remaining) < min(self.RATE_LIMIT_FLOOR, limit // 10) and int(reset) > self._next_allowed:
+            self._next_allowed = int(reset)
+            print(f"GitHub rate limit low ({remaining} remaining), pausing requests until {datetime.fromtimestamp(self._next_allowed)}")
+    
+    def _get_retry_after(self, response: httpx.Response) -> Optional[float]:
+        """Return seconds to wait before retrying a rate-limited response, or None if it should not be retried."""
+        if response.status_code not in (403, 429):
+            return None
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is not None:
+            return float(retry_after)
+        # Primary rate limit exhausted: wait for the window to reset
+        if response.headers.get("X-RateLimit-Remaining") == "0" and "X-RateLimit-Reset" in response.headers:
+            return max(0.0, int(response.headers["X-RateLimit-Reset"]) - time.time())
+        return None
     
     async def check_for_new_releases(self, owner: str, repo: str) -> List[Tuple[str, str, Release]]:
         """
@@ -141,9 +542,19 @@ class GitHubReleaseAgent(RoutedAgent):
             List of tuples containing (owner, repo, release) for new releases.
         """
         releases_data = await self.get_releases(owner, repo)
+        # None means nothing changed since the last fetch (HTTP 304)
         if not releases_data:
             return []
         
+        return self._process_releases(owner, repo, releases_data)
+    
+    def _process_releases(self, owner: str, repo: str, releases_data: List[Dict[str, Any]]) -> List[Tuple[str, str, Release]]:
+        """
+        Record fetched releases in the history and return the ones not seen before.
+        
+        Returns:
+            List of tuples containing (owner, repo, release) for new releases.
+        """
         # Ensure repository exists in history
         repo_index = self._ensure_repo_exists(owner, repo)
         
@@ -151,28 +562,41 @@ class GitHubReleaseAgent(RoutedAgent):
         self.history.repositories[repo_index].latest_check = datetime.now().isoformat()
         
         # Extract IDs of known releases
-        known_release_ids = [release.id for release in self.history.repositories[repo_index].releases]
+        known_release_ids = self._known_ids[(owner, repo)]
         print(f"Repository {owner}/{repo} has {len(known_release_ids)} known releases")
         
+        # Check every fetched release: backports can be published below already known releases
         new_releases = []
+        recorded_releases = []
+        new_release_ids = set()
         for release_data in releases_data:
-            if release_data['id'] not in known_release_ids:
+            # Drafts have no publish date yet; they are picked up once published
+            if release_data.get('draft'):
+                continue
+            if release_data['id'] in known_release_ids:
+                print(f"Skipping known release: {release_data['name'] or release_data['tag_name']} (ID: {release_data['id']})")
+                continue
+            if release_data['id'] not in new_release_ids:
                 print(f"Found new release: {release_data['name'] or release_data['tag_name']} (ID: {release_data['id']})")
-                release = Release(
+                # GitHub's release schema is stable, so skip pydantic validation; optional
+                # fields are normalized here so downstream code never sees None
+                release = Release.model_construct(
                     id=release_data['id'],
                     tag_name=release_data['tag_name'],
                     name=release_data['name'] or release_data['tag_name'],
-                    published_at=release_data['published_at'],
-                    html_url=release_data['html_url'],
-                    body=release_data.get('body', '')
+                    published_at=release_data['published_at'] or '',
+                    html_url=release_data['html_url'] or '',
+                    body=release_data.get('body') or ''
                 )
                 new_releases.append((owner, repo, release))
-                self.history.repositories[repo_index].releases.append(release)
-            else:
-                print(f"Skipping known release: {release_data['name'] or release_data['tag_name']} (ID: {release_data['id']})")
-        
-        if new_releases:
-            self._save_history()
+                # Release notes are only needed for the notification, not in the history
+                recorded_releases.append(release.model_copy(update={"body": None}))
+                new_release_ids.add(release.id)
+        
+        if recorded_releases:
+            self.history.repositories[repo_index].releases.extend(recorded_releases)
+            known_release_ids.update(new_release_ids)
+            self._append_releases(owner, repo, recorded_releases)
             
         return new_releases
     
@@ -185,18 +609,47 @@ class GitHubReleaseAgent(RoutedAgent):
             
         Returns:
             List of (owner, repo, release) tuples for all new releases
+        
+        Raises:
+            ReleaseFetchError: If no repository could be checked, e.g. during a GitHub outage.
         """
         all_new_releases = []
+        checked = 0
+        
+        # GraphQL needs authentication; with a token, fetch every repository in batched queries
+        if "Authorization" in self.headers:
+            releases_by_repo = await self._graphql_fetch_all(repositories)
+            if releases_by_repo is not None:
+                for (owner, repo), releases_data in releases_by_repo.items():
+                    all_new_releases.extend(self._process_releases(owner, repo, releases_data))
+                checked += len(releases_by_repo)
+                # Repositories GraphQL didn't cover are checked through the REST API
+                repositories = [key for key in repositories if key not in releases_by_repo]
+            else:
+                print("GraphQL fetch failed, falling back to the REST API")
+        
+        # Fetch the remaining repositories concurrently so network waits overlap
+        tasks = [self.check_for_new_releases(owner, repo) for owner, repo in repositories]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        for (owner, repo), result in zip(repositories, results):
+            if isinstance(result, BaseException):
+                print(f"Error checking {owner}/{repo}: {result}")
+                continue
+            checked += 1
+            all_new_releases.extend(result)
         
-        for owner, repo in repositories:
-            new_releases = await self.check_for_new_releases(owner, repo)
-            all_new_releases.extend(new_releases)
+        if repositories and not checked:
+            raise ReleaseFetchError("Failed to check any repository")
         
         return all_new_releases
 
 
 # Content Analysis Agent using LLM to extract key information
 class ContentAnalysisAgent(RoutedAgent):
+    # Release notes shorter than this (e.g. empty or just a link) are not sent to the LLM
+    MIN_BODY_LENGTH = 40
+    
     def __init__(self, model_client: OpenAIChatCompletionClient):
         super().__init__("A release content analysis agent")
         self._model_client = model_client
@@ -217,7 +670,14 @@ class ContentAnalysisAgent(RoutedAgent):
         )
     
     async def analyze_release(self, owner: str, repo: str, release: Release) -> str:
-        """Analyze release notes and extract key information."""
+        """Analyze release notes and extract key information as HTML free of Markdown code fences."""
+        # Nothing worth summarizing; skip the LLM round-trip
+        if not release.body or len(release.body.strip()) < self.MIN_BODY_LENGTH:
+            return (
+                f"<p>No detailed release notes provided. "
+                f"See <a href=\"{html.escape(release.html_url)}\">{html.escape(release.tag_name)}</a>.</p>"
+            )
+        
         prompt = (
             f"Repository: {owner}/{repo}\n"
             f"Release: {release.name} ({release.tag_name})\n"
@@ -236,8 +696,7 @@ class ContentAnalysisAgent(RoutedAgent):
         assert isinstance(response, str)
         
         # Clean up any markdown code block delimiters that might have been included
-        response = re.sub(r'```html', '', response)
-        response = re.sub(r'```', '', response)
+        response = _MD_FENCE.sub('', response)
         
         return response
 
@@ -253,37 +712,31 @@ class EmailNotificationAgent(RoutedAgent):
         # Format subject
         subject = f"New GitHub Release: {owner}/{repo} - {release.name}"
         
-        # Clean up any markdown that might have been included
-        clean_content = re.sub(r'```html', '', content_analysis)
-        clean_content = re.sub(r'```', '', clean_content)
+        # content_analysis comes from ContentAnalysisAgent, which already strips code fences
+        # Strip HTML tags in a single pass for the plain-text part
+        text_content = _HTML_STRIP.sub(lambda m: _HTML_STRIP_REPLACEMENTS.get(m.group(0), ''), content_analysis)
         
         # Basic text content for text/plain part
-        text_body = f"""
-New GitHub Release: {release.name} ({release.tag_name})
-Repository: {owner}/{repo}
-Published at: {release.published_at}
-URL: {release.html_url}
-
-Release Analysis:
-{clean_content.replace('<h2>', '').replace('</h2>', '').replace('<h3>', '').replace('</h3>', '').replace('<p>', '').replace('</p>', '').replace('<br>', '\n').replace('<ul>', '').replace('</ul>', '').replace('<li>', '- ').replace('</li>', '')}
-"""
-        
-        # HTML content for text/html part
-        html_body = f"""
-<html>
-<body>
-  <h1>New GitHub Release: {release.name}</h1>
-  <p><strong>Repository:</strong> <a href="https://github.com/{owner}/{repo}">{owner}/{repo}</a></p>
-  <p><strong>Tag:</strong> {release.tag_name}</p>
-  <p><strong>Published at:</strong> {release.published_at}</p>
-  <p><strong>URL:</strong> <a href="{release.html_url}">{release.html_url}</a></p>
-  
-  <hr>
-  <h2>Release Analysis</h2>
-  {clean_content}
-</body>
-</html>
-"""
+        text_body = _TEXT_TEMPLATE.format_map({
+            "name": release.name,
+            "tag_name": release.tag_name,
+            "owner": owner,
+            "repo": repo,
+            "published_at": release.published_at,
+            "url": release.html_url,
+            "analysis": text_content,
+        })
+        
+        # HTML content for text/html part; release fields are escaped, the analysis is already HTML
+        html_body = _HTML_TEMPLATE.format_map({
+            "name": html.escape(release.name),
+            "tag_name": html.escape(release.tag_name),
+            "owner": html.escape(owner),
+            "repo": html.escape(repo),
+            "published_at": html.escape(release.published_at),
+            "url": html.escape(release.html_url),
+            "analysis": content_analysis,
+        })
         
         # Create email payload
         email_payload = EmailPayload(
@@ -315,6 +768,11 @@ Release Analysis:
 
 # Main Release Monitor Orchestrator
 class ReleaseMonitorOrchestrator:
+    # Maximum number of releases analyzed and emailed at the same time
+    MAX_CONCURRENT_NOTIFICATIONS = 5
+    # Upper bound for the check interval while checks keep failing, as a multiple of check_interval
+    MAX_BACKOFF_FACTOR = 8
+    
     def __init__(
         self,
         repositories: List[Tuple[str, str]],
@@ -346,6 +804,7 @@ class ReleaseMonitorOrchestrator:
         # Create agents
         self.github_agent = GitHubReleaseAgent(history_file, github_token)
         self.analysis_agent = ContentAnalysisAgent(self.model_client)
+        self._notify_semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_NOTIFICATIONS)
         
         # Gmail MCP server configuration
         self.gmail_mcp_server = StdioServerParams(
@@ -375,6 +834,43 @@ class ReleaseMonitorOrchestrator:
         
         print("Initialization complete - only new releases will trigger notifications")
     
+    async def _notify_release(self, email_agent: EmailNotificationAgent, owner: str, repo: str, release: Release) -> bool:
+        """Analyze a new release and send its email notification."""
+        async with self._notify_semaphore:
+            print(f"New release in {owner}/{repo}: {release.name} ({release.tag_name})")
+            print(f"Published at: {release.published_at}")
+            print(f"URL: {release.html_url}")
+            print("-" * 40)
+            
+            # Analyze release content
+            content_analysis = await self.analysis_agent.analyze_release(owner, repo, release)
+            
+            # Send email notification
+            return await email_agent.send_notification(
+                self.recipient_email, owner, repo, release, content_analysis
+            )
+    
+    async def _check_once(self, email_agent: EmailNotificationAgent):
+        """Check all repositories once and notify about any new releases."""
+        print(f"\n[{datetime.now()}] Checking for new releases...")
+        
+        # Check for new releases across all repositories
+        new_releases = await self.github_agent.check_all_repositories(self.repositories)
+        
+        if new_releases:
+            print(f"Found {len(new_releases)} new release(s)!")
+            
+            # Analyze and notify all new releases concurrently
+            results = await asyncio.gather(
+                *(self._notify_release(email_agent, owner, repo, release) for owner, repo, release in new_releases),
+                return_exceptions=True
+            )
+            for (owner, repo, release), result in zip(new_releases, results):
+                if isinstance(result, BaseException):
+                    print(f"Failed to process release {release.tag_name} of {owner}/{repo}: {result}")
+        else:
+            print(f"No new releases found in any repository")
+    
     async def start_monitoring(self):
         """Start monitoring for new releases across all repositories."""
         repo_list = ", ".join([f"{owner}/{repo}" for owner, repo in self.repositories])
@@ -382,48 +878,44 @@ class ReleaseMonitorOrchestrator:
         print(f"Checking every {self.check_interval} seconds")
         print(f"Email notifications will be sent to: {self.recipient_email}")
         
-        # Initialize first to load existing releases
-        await self.initialize()
+        # One long-lived GitHub HTTP client, reused across every poll
+        await self.github_agent.start()
         
-        # Start the workbench in a context manager
-        async with McpWorkbench(self.gmail_mcp_server) as workbench:
-            # Create email agent with workbench
-            email_agent = EmailNotificationAgent(workbench)
-            
-            try:
+        try:
+            # Start the workbench in a context manager
+            async with McpWorkbench(self.gmail_mcp_server) as workbench:
+                # Create email agent with workbench
+                email_agent = EmailNotificationAgent(workbench)
+                
+                loop = asyncio.get_running_loop()
+                interval = self.check_interval
+                initialized = False
                 while True:
-                    print(f"\n[{datetime.now()}] Checking for new releases...")
+                    started = loop.time()
+                    try:
+                        if not initialized:
+                            # Initialize first to load existing releases; retried with the same backoff
+                            await self.initialize()
+                            initialized = True
+                            continue
+                        await self._check_once(email_agent)
+                        interval = self.check_interval
+                    except Exception as e:
+                        # Back off exponentially while checks keep failing
+                        interval = min(interval * 2, self.MAX_BACKOFF_FACTOR * self.check_interval)
+                        print(f"Error checking for new releases: {e}")
                     
-                    # Check for new releases across all repositories
-                    new_releases = await self.github_agent.check_all_repositories(self.repositories)
-                    
-                    if new_releases:
-                        print(f"Found {len(new_releases)} new release(s)!")
-                        
-                        for owner, repo, release in new_releases:
-                            print(f"New release in {owner}/{repo}: {release.name} ({release.tag_name})")
-                            print(f"Published at: {release.published_at}")
-                            print(f"URL: {release.html_url}")
-                            print("-" * 40)
-                            
-                            # Analyze release content
-                            content_analysis = await self.analysis_agent.analyze_release(owner, repo, release)
-                            
-                            # Send email notification
-                            await email_agent.send_notification(
-                                self.recipient_email, owner, repo, release, content_analysis
-                            )
-                    else:
-                        print(f"No new releases found in any repository")
-                    
-                    print(f"Next check in {self.check_interval} seconds")
-                    await asyncio.sleep(self.check_interval)
-            
-            except KeyboardInterrupt:
-                print("\nMonitoring stopped by user")
-            finally:
-                # Close the model client
-                await self.model_client.close()
+                    # Schedule from the start of this check so its duration doesn't cause drift
+                    delay = max(0.0, started + interval - loop.time())
+                    print(f"Next check in {delay:.0f} seconds")
+                    await asyncio.sleep(delay)
+        
+        except KeyboardInterrupt:
+            print("\nMonitoring stopped by user")
+        finally:
+            # Close the model client and the GitHub HTTP client
+            await self.model_client.close()
+            await self.github_agent.close()
 
 
 # Command-line interface